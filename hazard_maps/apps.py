@@ -6,18 +6,20 @@ class HazardMapsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hazard_maps'
 
+    # Database cache tables configured in settings.CACHES
+    CACHE_TABLES = ('osrm_cache_table', 'hazard_ingest_cache_table')
+
     def ready(self):
-        # Automatically create cache table if missing
+        # Automatically create cache tables if missing
         try:
             from django.db import connection
             with connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT to_regclass('public.osrm_cache_table');
-                """)
-                exists = cursor.fetchone()[0]
-                if not exists:
-                    print("⚙️ Creating missing cache table: osrm_cache_table")
-                    call_command('createcachetable', 'osrm_cache_table')
+                for table in self.CACHE_TABLES:
+                    cursor.execute("SELECT to_regclass(%s);", [f'public.{table}'])
+                    exists = cursor.fetchone()[0]
+                    if not exists:
+                        print(f"⚙️ Creating missing cache table: {table}")
+                        call_command('createcachetable', table)
         except (ProgrammingError, OperationalError):
             # Database might not be ready during migrations
             pass
\ No newline at end of file
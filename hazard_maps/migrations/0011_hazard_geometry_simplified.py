@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-14 09:00
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+# Keep in sync with models.SIMPLIFY_TOLERANCE (degrees)
+BACKFILL_SQL = """
+UPDATE {table}
+SET geometry_simplified = ST_Multi(ST_SimplifyPreserveTopology(geometry, 0.0001))
+WHERE geometry_simplified IS NULL;
+"""
+
+HAZARD_TABLES = [
+    'hazard_maps_floodsusceptibility',
+    'hazard_maps_landslidesusceptibility',
+    'hazard_maps_liquefactionsusceptibility',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hazard_maps", "0010_zonalvalue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="floodsusceptibility",
+            name="geometry_simplified",
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(
+                blank=True, null=True, spatial_index=False, srid=4326
+            ),
+        ),
+        migrations.AddField(
+            model_name="landslidesusceptibility",
+            name="geometry_simplified",
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(
+                blank=True, null=True, spatial_index=False, srid=4326
+            ),
+        ),
+        migrations.AddField(
+            model_name="liquefactionsusceptibility",
+            name="geometry_simplified",
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(
+                blank=True, null=True, spatial_index=False, srid=4326
+            ),
+        ),
+    ] + [
+        migrations.RunSQL(
+            BACKFILL_SQL.format(table=table),
+            reverse_sql=migrations.RunSQL.noop,
+        )
+        for table in HAZARD_TABLES
+    ]
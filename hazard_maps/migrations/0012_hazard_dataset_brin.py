@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-14 09:30
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hazard_maps", "0011_hazard_geometry_simplified"),
+    ]
+
+    operations = [
+        # The BRIN index replaces the ForeignKey's default B-tree, which the
+        # planner would otherwise always prefer
+        migrations.AlterField(
+            model_name="floodsusceptibility",
+            name="dataset",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="hazard_maps.hazarddataset",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="landslidesusceptibility",
+            name="dataset",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="hazard_maps.hazarddataset",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="liquefactionsusceptibility",
+            name="dataset",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="hazard_maps.hazarddataset",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="floodsusceptibility",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["dataset"], name="flood_dataset_brin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="landslidesusceptibility",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["dataset"], name="landslide_dataset_brin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="liquefactionsusceptibility",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["dataset"], name="liquefaction_dataset_brin"
+            ),
+        ),
+    ]
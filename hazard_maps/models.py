@@ -1,4 +1,27 @@
 from django.contrib.gis.db import models
+from django.contrib.gis.geos import MultiPolygon
+from django.contrib.postgres.indexes import BrinIndex
+
+# Tolerance (degrees, ~11 m) for the simplified geometry served to the map
+SIMPLIFY_TOLERANCE = 0.0001
+
+class SimplifiedGeometryMixin:
+    """Keep geometry_simplified in step with geometry on ORM saves (e.g. the admin)"""
+    
+    def save(self, *args, **kwargs):
+        if self.geometry is None:
+            self.geometry_simplified = None
+        else:
+            simplified = self.geometry.simplify(SIMPLIFY_TOLERANCE, preserve_topology=True)
+            if simplified.geom_type == 'Polygon':
+                simplified = MultiPolygon(simplified, srid=self.geometry.srid)
+            self.geometry_simplified = simplified if simplified.geom_type == 'MultiPolygon' else None
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'geometry' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'geometry_simplified'}
+        
+        super().save(*args, **kwargs)
 
 class HazardDataset(models.Model):
     """Model to track uploaded datasets"""
@@ -22,7 +45,7 @@ class HazardDataset(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_dataset_type_display()})"
 
-class FloodSusceptibility(models.Model):
+class FloodSusceptibility(SimplifiedGeometryMixin, models.Model):
     """Model for flood susceptibility data"""
     SUSCEPTIBILITY_LEVELS = [
         ('LS', 'Low Susceptibility'),
@@ -31,18 +54,27 @@ class FloodSusceptibility(models.Model):
         ('VHS', 'Very High Susceptibility'),
     ]
     
-    dataset = models.ForeignKey(HazardDataset, on_delete=models.CASCADE)
+    # Indexed by the BRIN index in Meta instead of the default B-tree
+    dataset = models.ForeignKey(HazardDataset, on_delete=models.CASCADE, db_index=False)
     flood_susc = models.CharField(max_length=3, choices=SUSCEPTIBILITY_LEVELS)
     original_code = models.CharField(max_length=10)
     shape_length = models.FloatField(null=True, blank=True)
     shape_area = models.FloatField(null=True, blank=True)
     orig_fid = models.IntegerField(null=True, blank=True)
     geometry = models.MultiPolygonField(srid=4326)
+    # Served to the map; never filtered on, so no spatial index to maintain
+    geometry_simplified = models.MultiPolygonField(srid=4326, null=True, blank=True, spatial_index=False)
+    
+    class Meta:
+        indexes = [
+            # Rows arrive in dataset order during an upload, so BRIN stays tiny
+            BrinIndex(fields=['dataset'], name='flood_dataset_brin'),
+        ]
     
     def __str__(self):
         return f"Flood {self.flood_susc} - FID: {self.orig_fid}"
 
-class LandslideSusceptibility(models.Model):
+class LandslideSusceptibility(SimplifiedGeometryMixin, models.Model):
     """Model for landslide susceptibility data"""
     SUSCEPTIBILITY_LEVELS = [
         ('LS', 'Low Susceptibility'),
@@ -52,18 +84,27 @@ class LandslideSusceptibility(models.Model):
         ('DF', 'Debris Flow - Critical Risk'),  # FIXED LABEL
     ]
     
-    dataset = models.ForeignKey(HazardDataset, on_delete=models.CASCADE)
+    # Indexed by the BRIN index in Meta instead of the default B-tree
+    dataset = models.ForeignKey(HazardDataset, on_delete=models.CASCADE, db_index=False)
     landslide_susc = models.CharField(max_length=3, choices=SUSCEPTIBILITY_LEVELS)
     original_code = models.CharField(max_length=10)
     shape_length = models.FloatField(null=True, blank=True)
     shape_area = models.FloatField(null=True, blank=True)
     orig_fid = models.IntegerField(null=True, blank=True)
     geometry = models.MultiPolygonField(srid=4326)
+    # Served to the map; never filtered on, so no spatial index to maintain
+    geometry_simplified = models.MultiPolygonField(srid=4326, null=True, blank=True, spatial_index=False)
+    
+    class Meta:
+        indexes = [
+            # Rows arrive in dataset order during an upload, so BRIN stays tiny
+            BrinIndex(fields=['dataset'], name='landslide_dataset_brin'),
+        ]
     
     def __str__(self):
         return f"Landslide {self.landslide_susc} - FID: {self.orig_fid}"
 
-class LiquefactionSusceptibility(models.Model):
+class LiquefactionSusceptibility(SimplifiedGeometryMixin, models.Model):
     """Model for liquefaction susceptibility data"""
     SUSCEPTIBILITY_LEVELS = [
         ('LS', 'Low Susceptibility'),
@@ -71,10 +112,19 @@ class LiquefactionSusceptibility(models.Model):
         ('HS', 'High Susceptibility'),
     ]
     
-    dataset = models.ForeignKey(HazardDataset, on_delete=models.CASCADE)
+    # Indexed by the BRIN index in Meta instead of the default B-tree
+    dataset = models.ForeignKey(HazardDataset, on_delete=models.CASCADE, db_index=False)
     liquefaction_susc = models.CharField(max_length=3, choices=SUSCEPTIBILITY_LEVELS)
     original_code = models.CharField(max_length=50)
     geometry = models.MultiPolygonField(srid=4326)
+    # Served to the map; never filtered on, so no spatial index to maintain
+    geometry_simplified = models.MultiPolygonField(srid=4326, null=True, blank=True, spatial_index=False)
+    
+    class Meta:
+        indexes = [
+            # Rows arrive in dataset order during an upload, so BRIN stays tiny
+            BrinIndex(fields=['dataset'], name='liquefaction_dataset_brin'),
+        ]
     
     def __str__(self):
         return f"Liquefaction {self.liquefaction_susc}"
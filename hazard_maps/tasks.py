@@ -0,0 +1,233 @@
+"""
+Background ingest of hazard shapefiles
+
+An upload is split into ShapefileProcessor.CHUNK_SIZE feature ranges that
+run in parallel on a process pool, each committed in its own transaction.
+If any chunk fails, the whole dataset is deleted once the others finish.
+Progress is recorded per chunk in the database-backed 'hazard_ingest'
+cache, so any web worker can answer the upload status endpoint.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pyogrio
+from django.core.cache import caches
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Keep task status around for a day after the upload
+STATUS_TIMEOUT = 60 * 60 * 24
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker():
+    """Configure Django in a freshly spawned pool worker"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hazard_system.settings')
+    import django
+    django.setup()
+
+
+def get_executor():
+    """
+    Return this web process's ingest pool, creating it on first use
+    
+    The pool is per web worker process, so it is kept small
+    (HAZARD_INGEST_WORKERS) rather than sized to the CPU count.
+    """
+    global _executor
+    
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'HAZARD_INGEST_WORKERS', 2),
+                # spawn, not fork: workers must open their own DB connections
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+        return _executor
+
+
+def submit(fn, *args):
+    """
+    Submit work to the ingest pool, replacing the pool if it is broken
+    
+    A worker that dies abruptly (out of memory, a crash inside GDAL) breaks
+    its ProcessPoolExecutor for good, so every later submit would raise
+    BrokenProcessPool until the web process restarts.
+    """
+    global _executor
+    
+    executor = get_executor()
+    try:
+        return executor.submit(fn, *args)
+    except BrokenProcessPool:
+        logger.warning("Ingest pool is broken, starting a new one")
+        with _executor_lock:
+            # Another thread may already have replaced it
+            if _executor is executor:
+                _executor = None
+        executor.shutdown(wait=False)
+        return get_executor().submit(fn, *args)
+
+
+def status_cache():
+    """
+    Cache holding task status
+    
+    A dedicated alias, so culling in the shared default cache can't evict
+    chunk results. Looked up per call: this module is imported before
+    django.setup() in workers.
+    """
+    return caches['hazard_ingest']
+
+
+def status_key(task_id, start=None):
+    """Cache key for a task's metadata, or for one of its chunks"""
+    if start is None:
+        return f"ingest_{task_id}"
+    return f"ingest_{task_id}_{start}"
+
+
+def ingest_chunk(task_id, dataset_type, shp_file, dataset_id, start, stop):
+    """Process features [start, stop) of a shapefile; runs in a pool worker"""
+    # Imported here: this module is loaded before django.setup() in workers
+    from django.db import transaction
+    from .models import HazardDataset
+    from .utils import ShapefileProcessor
+    
+    try:
+        dataset = HazardDataset.objects.get(id=dataset_id)
+        processor = ShapefileProcessor(None, dataset_type)
+        
+        with transaction.atomic():
+            records_created = processor.process_features(shp_file, dataset, start, stop)
+        
+        result = {
+            'records_created': records_created,
+            'features_skipped': processor.features_skipped
+        }
+        
+    except Exception as e:
+        logger.exception("Ingest chunk %s-%s failed", start, stop)
+        result = {'error': f"Features {start}-{stop}: {e}"}
+    
+    status_cache().set(status_key(task_id, start), result, STATUS_TIMEOUT)
+    return result
+
+
+def _finish_ingest(task_id, dataset_id, futures, upload_path):
+    """
+    Wait for every chunk, record crashed workers and remove the upload
+    
+    Chunks commit independently, so if any of them failed the dataset is
+    deleted (cascading to the chunks that did commit) rather than left
+    with partial coverage on the map.
+    """
+    from django.db import connection
+    from .models import HazardDataset
+    
+    try:
+        # futures maps chunk start -> Future; wait() needs the futures themselves
+        wait(futures.values())
+        failed = False
+        
+        for start, future in futures.items():
+            if future.exception() is not None:
+                failed = True
+                status_cache().set(status_key(task_id, start), {
+                    'error': f"Features from {start}: {future.exception()}"
+                }, STATUS_TIMEOUT)
+            elif 'error' in future.result():
+                failed = True
+        
+        if failed:
+            HazardDataset.objects.filter(id=dataset_id).delete()
+            logger.warning("Ingest task %s failed, removed dataset %s", task_id, dataset_id)
+    finally:
+        # This thread opened its own connection; don't leave it dangling
+        connection.close()
+        
+        if upload_path and os.path.exists(upload_path):
+            os.remove(upload_path)
+            logger.info("Cleaned up %s", upload_path)
+
+
+def start_ingest(dataset_type, shp_file, dataset_id, upload_path=None):
+    """
+    Queue parallel ingest of a hazard shapefile
+    
+    Args:
+        dataset_type: 'flood', 'landslide' or 'liquefaction'
+        shp_file: Path to the shapefile (may be a /vsizip/ path), readable by the workers
+        dataset_id: HazardDataset the features belong to
+        upload_path: File removed once every chunk has finished
+    
+    Returns:
+        Task id for get_ingest_status
+    """
+    from .utils import ShapefileProcessor
+    
+    chunk_size = ShapefileProcessor.CHUNK_SIZE
+    total = pyogrio.read_info(shp_file)['features']
+    starts = list(range(0, total, chunk_size))
+    
+    task_id = uuid.uuid4().hex
+    status_cache().set(status_key(task_id), {
+        'dataset_id': dataset_id,
+        'total_features': total,
+        'starts': starts
+    }, STATUS_TIMEOUT)
+    
+    futures = {
+        start: submit(
+            ingest_chunk, task_id, dataset_type, shp_file, dataset_id, start, start + chunk_size
+        )
+        for start in starts
+    }
+    
+    logger.info("Queued %s chunks (%s features) as task %s", len(futures), total, task_id)
+    
+    threading.Thread(
+        target=_finish_ingest, args=(task_id, dataset_id, futures, upload_path), daemon=True
+    ).start()
+    
+    return task_id
+
+
+def get_ingest_status(task_id):
+    """Summarize an ingest task from its per-chunk results, or None if unknown"""
+    meta = status_cache().get(status_key(task_id))
+    if meta is None:
+        return None
+    
+    results = status_cache().get_many([status_key(task_id, start) for start in meta['starts']]).values()
+    errors = [result['error'] for result in results if 'error' in result]
+    records_created = sum(result.get('records_created', 0) for result in results)
+    features_skipped = sum(result.get('features_skipped', 0) for result in results)
+    
+    if len(results) < len(meta['starts']):
+        status = 'processing'
+    elif errors:
+        status = 'failed'
+    else:
+        status = 'complete'
+    
+    return {
+        'status': status,
+        'dataset_id': meta['dataset_id'],
+        'total_features': meta['total_features'],
+        'chunks_total': len(meta['starts']),
+        'chunks_done': len(results),
+        'records_created': records_created,
+        'features_skipped': features_skipped,
+        'errors': errors
+    }
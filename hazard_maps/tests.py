@@ -1,3 +1,269 @@
-from django.test import TestCase
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+import shapely
+from django.test import SimpleTestCase, override_settings
+from shapely.geometry import MultiPolygon, Polygon, box
+
+from .models import HazardDataset, FloodSusceptibility, LandslideSusceptibility, LiquefactionSusceptibility
+from .tasks import _finish_ingest, get_ingest_status, status_cache, status_key
+from .utils import ShapefileProcessor
+
+
+class CopyValueTests(SimpleTestCase):
+    """COPY text-format encoding of single values"""
+
+    def test_none_is_null_marker(self):
+        self.assertEqual(ShapefileProcessor.copy_value(None), '\\N')
+
+    def test_empty_string_is_not_null(self):
+        self.assertEqual(ShapefileProcessor.copy_value(''), '')
+
+    def test_special_characters_are_escaped(self):
+        self.assertEqual(
+            ShapefileProcessor.copy_value('a\\b\tc\nd\re'),
+            'a\\\\b\\tc\\nd\\re'
+        )
+
+    def test_numbers_are_stringified(self):
+        self.assertEqual(ShapefileProcessor.copy_value(12), '12')
+        self.assertEqual(ShapefileProcessor.copy_value(1.5), '1.5')
+
+
+class CopyInsertTests(SimpleTestCase):
+    """Statement and buffer built by copy_insert"""
+
+    def run_copy(self, model, fields, rows):
+        with mock.patch('hazard_maps.utils.connection') as connection:
+            connection.ops.quote_name.side_effect = lambda name: f'"{name}"'
+            cursor = connection.cursor.return_value.__enter__.return_value
+            ShapefileProcessor(None, 'flood').copy_insert(model, fields, rows)
+        return cursor
+
+    def test_rows_are_tab_separated_lines(self):
+        cursor = self.run_copy(FloodSusceptibility, ShapefileProcessor.FLOOD_FIELDS, [
+            (1, 'HS', 'HF', 10.5, None, 12.0, '0106', '0106'),
+            (1, 'LS', 'LF', None, 2.0, None, '0107', '0107'),
+        ])
+
+        sql, buffer = cursor.copy_expert.call_args.args
+        self.assertEqual(
+            sql,
+            'COPY "hazard_maps_floodsusceptibility" ("dataset_id", "flood_susc", '
+            '"original_code", "shape_length", "shape_area", "orig_fid", '
+            '"geometry", "geometry_simplified") FROM STDIN'
+        )
+        # orig_fid read as a float is coerced like the ORM would
+        self.assertEqual(buffer.getvalue(), (
+            '1\tHS\tHF\t10.5\t\\N\t12\t0106\t0106\n'
+            '1\tLS\tLF\t\\N\t2.0\t\\N\t0107\t0107\n'
+        ))
+
+    def test_no_rows_skips_copy(self):
+        cursor = self.run_copy(FloodSusceptibility, ShapefileProcessor.FLOOD_FIELDS, [])
+        cursor.copy_expert.assert_not_called()
+
+
+class StandardizeCodesTests(SimpleTestCase):
+    """Vectorized code mapping matches the per-value standardize_code"""
+
+    SAMPLES = [
+        'LF', 'MF', 'ML', 'HF', 'VHF', 'LL', 'HL', 'VHL', 'DF', ' HF ', 'XX', '',
+        'Low Susceptibility', 'moderate susceptibility', 'HIGH SUSCEPTIBILITY', None, 3,
+    ]
+
+    def test_matches_scalar_mapping(self):
+        processor = ShapefileProcessor(None, 'flood')
+        codes = pd.Series(self.SAMPLES, dtype=object)
+
+        for dataset_type in ('flood', 'landslide', 'liquefaction'):
+            expected = [
+                processor.standardize_code('' if code is None else code, dataset_type)
+                for code in self.SAMPLES
+            ]
+            self.assertEqual(
+                list(processor.standardize_codes(codes, dataset_type)), expected, dataset_type
+            )
+
+
+class DropInvalidCodesTests(SimpleTestCase):
+    """Features whose codes can't be stored are dropped and counted"""
+
+    def test_unmapped_and_overlong_codes_are_dropped(self):
+        processor = ShapefileProcessor(None, 'flood')
+        gdf = pd.DataFrame({
+            'original_code': ['HF', 'UNKNOWN', 'H' * 11, 'DF'],
+            'flood_susc': ['HS', 'UNKNOWN', 'HS', 'DF'],
+        })
+
+        kept = processor.drop_invalid_codes(gdf, FloodSusceptibility, 'flood_susc')
+
+        self.assertEqual(list(kept.index), [0])
+        self.assertEqual(processor.features_skipped, 3)
+
+    def test_choices_are_per_model(self):
+        processor = ShapefileProcessor(None, 'landslide')
+        gdf = pd.DataFrame({'original_code': ['DF'], 'landslide_susc': ['DF']})
+
+        kept = processor.drop_invalid_codes(gdf, LandslideSusceptibility, 'landslide_susc')
+
+        self.assertEqual(len(kept), 1)
+        self.assertEqual(processor.features_skipped, 0)
+
+    def test_liquefaction_allows_longer_original_codes(self):
+        processor = ShapefileProcessor(None, 'liquefaction')
+        gdf = pd.DataFrame({
+            'original_code': ['Moderate Susceptibility'],
+            'liquefaction_susc': ['MS'],
+        })
+
+        kept = processor.drop_invalid_codes(gdf, LiquefactionSusceptibility, 'liquefaction_susc')
+
+        self.assertEqual(len(kept), 1)
+
+
+class ToHexEwkbTests(SimpleTestCase):
+    """Vectorized MultiPolygon promotion and EWKB encoding"""
+
+    def decode(self, hexewkb):
+        return shapely.from_wkb(hexewkb)
+
+    def test_polygons_are_promoted_with_srid(self):
+        polygon = box(123.0, 9.0, 123.1, 9.1)
+        multi = MultiPolygon([box(0, 0, 1, 1), box(2, 2, 3, 3)])
+
+        encoded = ShapefileProcessor.to_hexewkb([polygon, multi])
+        promoted, unchanged = (self.decode(value) for value in encoded)
+
+        self.assertEqual(promoted.geom_type, 'MultiPolygon')
+        self.assertTrue(promoted.equals(MultiPolygon([polygon])))
+        self.assertEqual(unchanged.geom_type, 'MultiPolygon')
+        self.assertTrue(unchanged.equals(multi))
+        self.assertEqual(list(shapely.get_srid([promoted, unchanged])), [4326, 4326])
+
+    def test_input_is_not_modified(self):
+        geoms = pd.Series([Polygon([(0, 0), (1, 0), (1, 1)])])
+
+        ShapefileProcessor.to_hexewkb(geoms)
+
+        self.assertEqual(geoms[0].geom_type, 'Polygon')
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'hazard_ingest': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+})
+class IngestStatusTests(SimpleTestCase):
+    """get_ingest_status aggregation of per-chunk results"""
+
+    TASK_ID = 'task'
+
+    def setUp(self):
+        status_cache().clear()
+        status_cache().set(status_key(self.TASK_ID), {
+            'dataset_id': 7,
+            'total_features': 25000,
+            'starts': [0, 10000, 20000],
+        })
+
+    def set_chunk(self, start, result):
+        status_cache().set(status_key(self.TASK_ID, start), result)
+
+    def test_unknown_task(self):
+        self.assertIsNone(get_ingest_status('missing'))
+
+    def test_processing_until_every_chunk_reports(self):
+        self.set_chunk(0, {'records_created': 10000, 'features_skipped': 0})
+
+        status = get_ingest_status(self.TASK_ID)
+
+        self.assertEqual(status['status'], 'processing')
+        self.assertEqual(status['chunks_done'], 1)
+        self.assertEqual(status['chunks_total'], 3)
+
+    def test_complete_sums_chunks(self):
+        self.set_chunk(0, {'records_created': 9998, 'features_skipped': 2})
+        self.set_chunk(10000, {'records_created': 10000, 'features_skipped': 0})
+        self.set_chunk(20000, {'records_created': 4999, 'features_skipped': 1})
+
+        status = get_ingest_status(self.TASK_ID)
+
+        self.assertEqual(status['status'], 'complete')
+        self.assertEqual(status['dataset_id'], 7)
+        self.assertEqual(status['records_created'], 24997)
+        self.assertEqual(status['features_skipped'], 3)
+        self.assertEqual(status['errors'], [])
+
+    def test_any_error_fails_the_task(self):
+        self.set_chunk(0, {'records_created': 10000, 'features_skipped': 0})
+        self.set_chunk(10000, {'error': 'Features 10000-20000: boom'})
+        self.set_chunk(20000, {'records_created': 5000, 'features_skipped': 0})
+
+        status = get_ingest_status(self.TASK_ID)
+
+        self.assertEqual(status['status'], 'failed')
+        self.assertEqual(status['errors'], ['Features 10000-20000: boom'])
+
+
+def crash_chunk():
+    raise MemoryError('worker died')
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'hazard_ingest': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+})
+class FinishIngestTests(SimpleTestCase):
+    """_finish_ingest cleanup once every chunk has finished"""
+
+    TASK_ID = 'task'
+    DATASET_ID = 7
+
+    def setUp(self):
+        status_cache().clear()
+        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as upload:
+            self.upload_path = upload.name
+        self.addCleanup(lambda: os.path.exists(self.upload_path) and os.remove(self.upload_path))
+
+    def finish(self, *chunks):
+        """Run _finish_ingest over chunk callables executed on a thread pool"""
+        with ThreadPoolExecutor() as executor:
+            futures = {
+                start: executor.submit(chunk)
+                for start, chunk in zip(range(0, 10000 * len(chunks), 10000), chunks)
+            }
+            with mock.patch.object(HazardDataset, 'objects') as objects, \
+                    mock.patch('django.db.connection'):
+                _finish_ingest(self.TASK_ID, self.DATASET_ID, futures, self.upload_path)
+        return objects
+
+    def test_success_keeps_dataset_and_removes_upload(self):
+        objects = self.finish(
+            lambda: {'records_created': 10000, 'features_skipped': 0},
+            lambda: {'records_created': 5000, 'features_skipped': 0},
+        )
+
+        objects.filter.assert_not_called()
+        self.assertFalse(os.path.exists(self.upload_path))
+
+    def test_failed_chunk_deletes_dataset(self):
+        objects = self.finish(
+            lambda: {'records_created': 10000, 'features_skipped': 0},
+            lambda: {'error': 'Features 10000-20000: boom'},
+        )
+
+        objects.filter.assert_called_once_with(id=self.DATASET_ID)
+        objects.filter.return_value.delete.assert_called_once_with()
+        self.assertFalse(os.path.exists(self.upload_path))
+
+    def test_crashed_worker_is_recorded(self):
+        objects = self.finish(
+            lambda: {'records_created': 10000, 'features_skipped': 0},
+            crash_chunk,
+        )
+
+        objects.filter.return_value.delete.assert_called_once_with()
+        self.assertIn('worker died', status_cache().get(status_key(self.TASK_ID, 10000))['error'])
@@ -4,9 +4,11 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('api/upload-shapefile/', views.upload_shapefile, name='upload_shapefile'),
+    path('api/upload-status/<str:task_id>/', views.get_upload_status, name='upload_status'),
     path('api/flood-data/', views.get_flood_data, name='flood_data'),
     path('api/landslide-data/', views.get_landslide_data, name='landslide_data'),
     path('api/liquefaction-data/', views.get_liquefaction_data, name='liquefaction_data'),
+    path('api/tiles/<str:layer>/<int:z>/<int:x>/<int:y>.pbf', views.get_hazard_tile, name='hazard_tile'),
     path('api/barangay-data/', views.get_barangay_data, name='barangay_data'),  # NEW
     path('api/barangay-from-point/', views.get_barangay_from_point, name='barangay_from_point'),  # NEW
     path('api/municipality-info/', views.get_municipality_info, name='municipality_info'),
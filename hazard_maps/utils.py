@@ -1,4 +1,10 @@
 import fiona
+import io
+import logging
+import numpy as np
+import pyogrio
+import pandas as pd
+import shapely
 import zipfile
 import os
 import tempfile
@@ -7,16 +13,87 @@ import time
 from typing import Dict, Optional, List, Tuple
 import time
 from django.core.cache import cache
+from django.db import connection
 from math import radians, cos, sin, asin, sqrt
 import hashlib
+from django.contrib.gis.gdal import CoordTransform, SpatialReference
 from django.contrib.gis.geos import GEOSGeometry, Point
+from django.contrib.gis.db.models import GeometryField
 from django.contrib.gis.measure import D
 from fiona.io import ZipMemoryFile
+from shapely.geometry import shape, MultiPolygon as ShapelyMultiPolygon
+from pyproj import CRS, Transformer
+from django.conf import settings
 from .models import HazardDataset, FloodSusceptibility, LandslideSusceptibility, LiquefactionSusceptibility
-import json
+from .models import SIMPLIFY_TOLERANCE
 import csv
 from decimal import Decimal
 
+logger = logging.getLogger(__name__)
+
+try:
+    # Optional GPU reprojection (RAPIDS); see HAZARD_GPU_REPROJECTION
+    import cupy as cp
+    import cuproj
+except ImportError:
+    cp = None
+    cuproj = None
+
+
+class GPUTransformer:
+    """
+    cuProj transformer to WGS84 with pyproj's always_xy transform() signature
+    
+    cuProj follows the authority axis order, so EPSG:4326 output comes back
+    as (lat, lng); transform() swaps it to (x, y) like pyproj with always_xy.
+    """
+    
+    def __init__(self, source_crs):
+        self.transformer = cuproj.Transformer.from_crs(source_crs.to_string(), 'EPSG:4326')
+        
+    def transform(self, xs, ys):
+        """Transform host coordinate arrays on the GPU and copy the result back"""
+        lat, lng = self.transformer.transform(cp.asarray(xs), cp.asarray(ys))
+        return cp.asnumpy(lng), cp.asnumpy(lat)
+
+
+class WindowTransformer:
+    """
+    pyproj transformer to WGS84 that sends large coordinate batches to the GPU
+    
+    Each transform() call reprojects one window of iter_hazard_layer, so the
+    GPU decision is made per call: batches of at least
+    HAZARD_GPU_MIN_COORDINATES points go through cuProj when
+    HAZARD_GPU_REPROJECTION is on, smaller ones stay on PROJ. The cuProj
+    transformer, and with it this worker process's CUDA context, is only
+    created once such a batch arrives.
+    """
+    
+    def __init__(self, source_crs):
+        self.source_crs = source_crs
+        self.cpu = Transformer.from_crs(source_crs, 4326, always_xy=True)
+        self.gpu = None
+        self.gpu_enabled = getattr(settings, 'HAZARD_GPU_REPROJECTION', False)
+        self.gpu_threshold = getattr(settings, 'HAZARD_GPU_MIN_COORDINATES', 1000000)
+        
+        if self.gpu_enabled and cuproj is None:
+            logger.warning("GPU reprojection enabled but cuproj is not installed, using PROJ")
+            self.gpu_enabled = False
+    
+    def transform(self, xs, ys):
+        """Transform coordinate arrays, on the GPU when the batch is large enough"""
+        if self.gpu_enabled and len(xs) >= self.gpu_threshold:
+            if self.gpu is None:
+                try:
+                    self.gpu = GPUTransformer(self.source_crs)
+                except Exception as gpu_error:
+                    logger.warning("cuProj cannot handle %s (%s), using PROJ", self.source_crs.name, gpu_error)
+                    self.gpu_enabled = False
+                    return self.cpu.transform(xs, ys)
+            return self.gpu.transform(xs, ys)
+        
+        return self.cpu.transform(xs, ys)
+
 
 class ShapefileProcessor:
     """Process and standardize shapefile data"""
@@ -46,10 +123,36 @@ class ShapefileProcessor:
         'High susceptibility': 'HS'
     }
     
+    # Case-folded lookup so liquefaction codes match in a single dict access
+    _LIQ_CF = {key.casefold(): value for key, value in LIQUEFACTION_MAPPING.items()}
+    
+    # Dataset types ingested from a plain shapefile
+    HAZARD_TYPES = ('flood', 'landslide', 'liquefaction')
+    
+    # Columns written by COPY for each hazard model, in row tuple order
+    FLOOD_FIELDS = (
+        'dataset', 'flood_susc', 'original_code', 'shape_length', 'shape_area',
+        'orig_fid', 'geometry', 'geometry_simplified'
+    )
+    LANDSLIDE_FIELDS = (
+        'dataset', 'landslide_susc', 'original_code', 'shape_length', 'shape_area',
+        'orig_fid', 'geometry', 'geometry_simplified'
+    )
+    LIQUEFACTION_FIELDS = (
+        'dataset', 'liquefaction_susc', 'original_code', 'geometry', 'geometry_simplified'
+    )
+    
+    # Number of features read from the shapefile per window
+    CHUNK_SIZE = 10000
+    
+    # Tolerance (degrees) for the simplified geometry served to the map
+    SIMPLIFY_TOLERANCE = SIMPLIFY_TOLERANCE
+    
     def __init__(self, uploaded_file, dataset_type):
         self.uploaded_file = uploaded_file
         self.dataset_type = dataset_type
-        self.temp_dir = None
+        self.temp_zip_path = None
+        self.features_skipped = 0
         
     
     def standardize_code(self, original_code, dataset_type):
@@ -61,165 +164,355 @@ class ShapefileProcessor:
         elif dataset_type == 'landslide':
             return self.LANDSLIDE_MAPPING.get(original_code, original_code)
         elif dataset_type == 'liquefaction':
-            for key, value in self.LIQUEFACTION_MAPPING.items():
-                if original_code.lower() == key.lower():
-                    return value
-            return 'LS'
+            return self._LIQ_CF.get(original_code.casefold(), 'LS')
         
         return original_code
     
-    def transform_geometry(self, geom_dict, source_crs):
-        """Transform geometry from PRS92/Luzon 1911 to WGS84"""
+    def transform_geometry(self, geom_dict, ct=None):
+        """
+        Build a WGS84 MultiPolygon from a GeoJSON-like geometry
+        
+        `ct` is a CoordTransform from build_coord_transform, built once per
+        layer; None means the data is already in WGS84.
+        """
         try:
-            if hasattr(geom_dict, '__geo_interface__'):
-                geom_data = geom_dict.__geo_interface__
-            else:
-                geom_data = geom_dict
+            # shape() accepts both GeoJSON dicts and fiona geometries
+            # (__geo_interface__); hand GEOS the WKB instead of a JSON string
+            shp = shape(geom_dict)
+            if shp.geom_type == 'Polygon':
+                shp = ShapelyMultiPolygon([shp])
             
-            geometry = GEOSGeometry(json.dumps(geom_data))
+            geometry = GEOSGeometry(memoryview(shp.wkb))
             
-            # Check CRS - EPSG:4253 is PRS92 (Philippine Reference System 1992)
-            # which is based on Luzon 1911 datum and needs transformation
-            crs_string = str(source_crs).upper() if source_crs else ''
-            
-            # Check if CRS is 4253 or mentions Luzon
-            if '4253' in crs_string or 'LUZON' in crs_string or 'PRS92' in crs_string:
-                print(f"Transforming from EPSG:4253 (PRS92/Luzon 1911) to WGS84")
-                geometry.srid = 4253
-                geometry.transform(4326)
-            else:
-                print(f"Data already in WGS84 or unknown CRS")
-                geometry.srid = 4326
-            
-            if geometry.geom_type == 'Polygon':
-                from django.contrib.gis.geos import MultiPolygon
-                geometry = MultiPolygon(geometry)
+            if ct is not None:
+                geometry.transform(ct)
+            geometry.srid = 4326
             
             return geometry
             
         except Exception as e:
-            print(f"Geometry transformation error: {e}")
-            print(f"Source CRS: {source_crs}")
+            logger.error("Geometry transformation error: %s", e)
             raise
+    
+    def build_coord_transform(self, source_wkt):
+        """
+        Build a single GDAL CoordTransform from a layer's CRS WKT to WGS84
+        
+        Returns None when the data is already in WGS84 or declares no CRS,
+        matching build_transformer for the GeoDataFrame path.
+        """
+        if not source_wkt:
+            logger.info("Data already in WGS84 or unknown CRS")
+            return None
         
-    def process_flood_data(self, shp_file, dataset):
+        source_srs = SpatialReference(source_wkt)
+        target_srs = SpatialReference(4326)
+        if source_srs.srid == 4326:
+            return None
+        
+        logger.info("Transforming from %s to WGS84", source_srs.name)
+        return CoordTransform(source_srs, target_srs)
+        
+    def standardize_codes(self, codes, dataset_type):
+        """Vectorized standardize_code over a pandas Series of raw codes"""
+        codes = codes.fillna('').astype(str).str.strip()
+        
+        if dataset_type == 'flood':
+            return codes.map(self.FLOOD_MAPPING).fillna(codes)
+        elif dataset_type == 'landslide':
+            return codes.map(self.LANDSLIDE_MAPPING).fillna(codes)
+        elif dataset_type == 'liquefaction':
+            return codes.str.casefold().map(self._LIQ_CF).fillna('LS')
+        
+        return codes
+    
+    def drop_invalid_codes(self, gdf, model, susc_field):
+        """
+        Drop features whose codes don't fit the model's columns
+        
+        An unmapped susceptibility code (not one of the field's choices) or
+        an original code longer than its column would make the whole COPY
+        fail, so those features are counted in features_skipped, logged
+        once per window with their distinct codes, and left out.
+        """
+        choices = [value for value, _ in model._meta.get_field(susc_field).choices]
+        max_length = model._meta.get_field('original_code').max_length
+        
+        invalid = ~gdf[susc_field].isin(choices) | (
+            gdf['original_code'].astype(str).str.len() > max_length
+        )
+        skipped = int(invalid.sum())
+        if skipped:
+            # One line per window, not per feature
+            logger.warning(
+                "Skipping %s features with unsupported susceptibility codes: %s",
+                skipped, list(gdf.loc[invalid, 'original_code'].unique())
+            )
+        
+        self.features_skipped += skipped
+        return gdf[~invalid]
+    
+    def build_transformer(self, source_crs):
+        """
+        Build a single transformer from the shapefile CRS to WGS84
+        
+        Returns None when the data is already in WGS84 or declares no CRS
+        (the latter is assumed to be WGS84, as in transform_geometry).
+        Large windows use cuProj on the GPU when HAZARD_GPU_REPROJECTION
+        is enabled (see WindowTransformer).
+        """
+        if not source_crs:
+            logger.info("Data already in WGS84 or unknown CRS")
+            return None
+        
+        source_crs = CRS.from_user_input(source_crs)
+        if source_crs == CRS.from_epsg(4326):
+            return None
+        
+        logger.info("Transforming from %s to WGS84", source_crs.name)
+        return WindowTransformer(source_crs)
+    
+    def iter_hazard_layer(self, shp_file, columns, start=0, stop=None):
+        """
+        Yield a hazard shapefile as GeoDataFrame windows reprojected to WGS84
+        
+        Features are read CHUNK_SIZE at a time through pyogrio's vectorized
+        reader, so peak memory is bounded by the window size instead of the
+        size of the layer. Coordinates of each window are reprojected in one
+        vectorized call through a transformer built once for the whole file,
+        and a simplified copy of each geometry is added for map responses.
+        Both are also encoded as hex EWKB (geometry_ewkb/simplified_ewkb)
+        for copy_insert.
+        `start`/`stop` restrict reading to a feature range (used by the
+        parallel ingest workers in tasks.py).
+        """
+        info = pyogrio.read_info(shp_file)
+        total = info['features']
+        logger.info("Shapefile CRS: %s", info['crs'])
+        logger.info("Total features: %s", total)
+        
+        transformer = self.build_transformer(info['crs'])
+        stop = total if stop is None else min(stop, total)
+        
+        for offset in range(start, stop, self.CHUNK_SIZE):
+            gdf = pyogrio.read_dataframe(
+                shp_file,
+                columns=columns,
+                skip_features=offset,
+                max_features=min(self.CHUNK_SIZE, stop - offset)
+            )
+            gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+            gdf = gdf.set_crs(4326, allow_override=True)
+            
+            if transformer is not None:
+                gdf['geometry'] = shapely.transform(
+                    gdf.geometry.to_numpy(),
+                    lambda coords: np.column_stack(transformer.transform(coords[:, 0], coords[:, 1]))
+                )
+            
+            gdf['geometry_simplified'] = gdf.geometry.simplify(
+                self.SIMPLIFY_TOLERANCE, preserve_topology=True
+            )
+            
+            gdf['geometry_ewkb'] = self.to_hexewkb(gdf.geometry)
+            gdf['simplified_ewkb'] = self.to_hexewkb(gdf['geometry_simplified'])
+            
+            # Keep feature numbering global across windows for error messages
+            gdf.index = gdf.index + offset
+            
+            yield gdf
+    
+    @staticmethod
+    def to_hexewkb(geoms):
+        """
+        Vectorized hex EWKB (SRID 4326) of shapely geometries, for COPY input
+        
+        Polygons are promoted to MultiPolygons in shapely, so each geometry
+        is encoded once with no intermediate GEOS copy.
+        """
+        geoms = np.array(geoms, dtype=object)
+        polygons = shapely.get_type_id(geoms) == shapely.GeometryType.POLYGON
+        if polygons.any():
+            geoms[polygons] = shapely.multipolygons(geoms[polygons][:, np.newaxis])
+        
+        return shapely.to_wkb(shapely.set_srid(geoms, 4326), hex=True, include_srid=True)
+    
+    @staticmethod
+    def column(gdf, name, default=None):
+        """Return a column from the frame, or a constant Series if it is missing"""
+        if name in gdf.columns:
+            return gdf[name]
+        return pd.Series(default, index=gdf.index, dtype=object)
+    
+    @staticmethod
+    def clean_value(value):
+        """Map pandas missing values (NaN/NaT/None) to None (SQL NULL)"""
+        return None if pd.isna(value) else value
+    
+    @staticmethod
+    def copy_value(value):
+        """Encode a value for PostgreSQL's COPY text format"""
+        if value is None:
+            return '\\N'
+        return (
+            str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r')
+        )
+    
+    def copy_insert(self, model, fields, rows):
+        """
+        Stream rows into a model's table with COPY ... FROM STDIN
+        
+        `fields` are model field names matching each row tuple. This skips
+        ORM parameter binding entirely; geometries are passed as hex EWKB,
+        which PostGIS parses directly.
+        """
+        if not rows:
+            return
+        
+        quote = connection.ops.quote_name
+        model_fields = [model._meta.get_field(name) for name in fields]
+        columns = ', '.join(quote(field.column) for field in model_fields)
+        sql = f"COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN"
+        
+        # Coerce scalars the way the ORM would (e.g. 12.0 -> 12 for an
+        # IntegerField read from a float column); geometries are already EWKB
+        prep = [
+            (lambda value: value) if isinstance(field, GeometryField) else field.get_prep_value
+            for field in model_fields
+        ]
+        data = ''.join(
+            '\t'.join(
+                self.copy_value(None if value is None else to_db(value))
+                for to_db, value in zip(prep, row)
+            ) + '\n'
+            for row in rows
+        )
+        
+        with connection.cursor() as cursor:
+            if hasattr(cursor, 'copy_expert'):
+                # psycopg2
+                cursor.copy_expert(sql, io.StringIO(data))
+            else:
+                # psycopg 3
+                with cursor.copy(sql) as copy:
+                    copy.write(data)
+        
+    def process_flood_data(self, shp_file, dataset, start=0, stop=None):
         """Process flood susceptibility shapefile"""
         records_created = 0
-        errors = []
         
         try:
-            with fiona.open(shp_file) as shapefile:
-                print(f"Shapefile CRS: {shapefile.crs}")
-                print(f"Total features: {len(shapefile)}")
+            chunks = self.iter_hazard_layer(
+                shp_file, ['FloodSusc', 'SHAPE_Leng', 'SHAPE_Area', 'ORIG_FID'], start, stop
+            )
+            
+            for gdf in chunks:
+                gdf['original_code'] = self.column(gdf, 'FloodSusc', '').fillna('')
+                gdf['flood_susc'] = self.standardize_codes(gdf['original_code'], 'flood')
+                gdf = self.drop_invalid_codes(gdf, FloodSusceptibility, 'flood_susc')
                 
-                for idx, feature in enumerate(shapefile):
-                    try:
-                        props = feature['properties']
-                        geom = feature['geometry']
-                        
-                        if geom is None:
-                            continue
-                        
-                        original_code = props.get('FloodSusc', '')
-                        standardized_code = self.standardize_code(original_code, 'flood')
-                        geometry = self.transform_geometry(geom, shapefile.crs)
-                        
-                        FloodSusceptibility.objects.create(
-                            dataset=dataset,
-                            flood_susc=standardized_code,
-                            original_code=original_code,
-                            shape_length=props.get('SHAPE_Leng'),
-                            shape_area=props.get('SHAPE_Area'),
-                            orig_fid=props.get('ORIG_FID'),
-                            geometry=geometry
-                        )
-                        records_created += 1
-                        
-                        if records_created % 100 == 0:
-                            print(f"Processed {records_created} features...")
-                        
-                    except Exception as feature_error:
-                        error_msg = f"Error processing feature {idx}: {feature_error}"
-                        print(error_msg)
-                        errors.append(error_msg)
-                        continue
+                rows = [
+                    (
+                        dataset.id,
+                        row.flood_susc,
+                        row.original_code,
+                        self.clean_value(getattr(row, 'SHAPE_Leng', None)),
+                        self.clean_value(getattr(row, 'SHAPE_Area', None)),
+                        self.clean_value(getattr(row, 'ORIG_FID', None)),
+                        row.geometry_ewkb,
+                        row.simplified_ewkb
+                    )
+                    for row in gdf.itertuples()
+                ]
+                
+                self.copy_insert(FloodSusceptibility, self.FLOOD_FIELDS, rows)
+                records_created += len(rows)
+                logger.info("Processed %s features...", records_created)
                         
         except Exception as file_error:
-            print(f"Error opening shapefile: {file_error}")
+            logger.error("Error opening shapefile: %s", file_error)
             raise
         
         return records_created
     
-    def process_landslide_data(self, shp_file, dataset):
+    def process_landslide_data(self, shp_file, dataset, start=0, stop=None):
         """Process landslide susceptibility shapefile"""
         records_created = 0
         
-        with fiona.open(shp_file) as shapefile:
-            print(f"Processing landslide - CRS: {shapefile.crs}")
+        chunks = self.iter_hazard_layer(
+            shp_file, ['LndslideSu', 'LndSu', 'SHAPE_Leng', 'SHAPE_Area', 'ORIG_FID'], start, stop
+        )
+        
+        for gdf in chunks:
+            # Older MGB layers name the susceptibility field LndSu instead of LndslideSu
+            primary_codes = self.column(gdf, 'LndslideSu')
+            fallback_codes = self.column(gdf, 'LndSu', '')
+            gdf['original_code'] = primary_codes.where(
+                primary_codes.notna() & (primary_codes != ''), fallback_codes
+            ).fillna('')
+            gdf['landslide_susc'] = self.standardize_codes(gdf['original_code'], 'landslide')
+            gdf = self.drop_invalid_codes(gdf, LandslideSusceptibility, 'landslide_susc')
             
-            for idx, feature in enumerate(shapefile):
-                try:
-                    props = feature['properties']
-                    geom = feature['geometry']
-                    
-                    if geom is None:
-                        continue
-                    
-                    original_code = props.get('LndslideSu') or props.get('LndSu', '')
-                    standardized_code = self.standardize_code(original_code, 'landslide')
-                    geometry = self.transform_geometry(geom, shapefile.crs)
-                    
-                    LandslideSusceptibility.objects.create(
-                        dataset=dataset,
-                        landslide_susc=standardized_code,
-                        original_code=original_code,
-                        shape_length=props.get('SHAPE_Leng'),
-                        shape_area=props.get('SHAPE_Area'),
-                        orig_fid=props.get('ORIG_FID'),
-                        geometry=geometry
-                    )
-                    records_created += 1
-                    
-                except Exception as e:
-                    print(f"Error processing landslide feature {idx}: {e}")
-                    continue
+            rows = [
+                (
+                    dataset.id,
+                    row.landslide_susc,
+                    row.original_code,
+                    self.clean_value(getattr(row, 'SHAPE_Leng', None)),
+                    self.clean_value(getattr(row, 'SHAPE_Area', None)),
+                    self.clean_value(getattr(row, 'ORIG_FID', None)),
+                    row.geometry_ewkb,
+                    row.simplified_ewkb
+                )
+                for row in gdf.itertuples()
+            ]
+            
+            self.copy_insert(LandslideSusceptibility, self.LANDSLIDE_FIELDS, rows)
+            records_created += len(rows)
                 
         return records_created
     
-    def process_liquefaction_data(self, shp_file, dataset):
+    def process_liquefaction_data(self, shp_file, dataset, start=0, stop=None):
         """Process liquefaction susceptibility shapefile"""
         records_created = 0
         
-        with fiona.open(shp_file) as shapefile:
-            print(f"Processing liquefaction - CRS: {shapefile.crs}")
+        for gdf in self.iter_hazard_layer(shp_file, ['Susceptibi'], start, stop):
+            gdf['original_code'] = self.column(gdf, 'Susceptibi', '').fillna('').astype(str).str.strip()
+            gdf['liquefaction_susc'] = self.standardize_codes(gdf['original_code'], 'liquefaction')
+            gdf = self.drop_invalid_codes(gdf, LiquefactionSusceptibility, 'liquefaction_susc')
             
-            for idx, feature in enumerate(shapefile):
-                try:
-                    props = feature['properties']
-                    geom = feature['geometry']
-                    
-                    if geom is None:
-                        continue
-                    
-                    original_code = props.get('Susceptibi', '').strip()
-                    standardized_code = self.standardize_code(original_code, 'liquefaction')
-                    geometry = self.transform_geometry(geom, shapefile.crs)
-                    
-                    LiquefactionSusceptibility.objects.create(
-                        dataset=dataset,
-                        liquefaction_susc=standardized_code,
-                        original_code=original_code,
-                        geometry=geometry
-                    )
-                    records_created += 1
-                    
-                except Exception as e:
-                    print(f"Error processing liquefaction feature {idx}: {e}")
-                    continue
+            rows = [
+                (
+                    dataset.id,
+                    row.liquefaction_susc,
+                    row.original_code,
+                    row.geometry_ewkb,
+                    row.simplified_ewkb
+                )
+                for row in gdf.itertuples()
+            ]
+            
+            self.copy_insert(LiquefactionSusceptibility, self.LIQUEFACTION_FIELDS, rows)
+            records_created += len(rows)
                 
         return records_created
 
 
+    def process_features(self, shp_file, dataset, start=0, stop=None):
+        """Route a hazard shapefile (or a feature range of it) to its processor"""
+        if self.dataset_type == 'flood':
+            return self.process_flood_data(shp_file, dataset, start, stop)
+        elif self.dataset_type == 'landslide':
+            return self.process_landslide_data(shp_file, dataset, start, stop)
+        elif self.dataset_type == 'liquefaction':
+            return self.process_liquefaction_data(shp_file, dataset, start, stop)
+        
+        raise ValueError(f"Unsupported dataset type: {self.dataset_type}")
+
     def process_barangay_gdb(self, gdb_path, dataset):
         """
         Process File Geodatabase (.gdb) containing barangay boundaries
@@ -278,6 +571,9 @@ class ShapefileProcessor:
                 print(f"📊 CRS: {shapefile.crs}")
                 print(f"📈 Total features: {len(shapefile)}")
                 
+                # One PROJ setup for the whole layer, not one per feature
+                ct = self.build_coord_transform(shapefile.crs_wkt)
+                
                 # Print sample feature to understand structure
                 print(f"\n🔍 Inspecting first feature...")
                 first_feature = next(iter(shapefile))
@@ -325,7 +621,7 @@ class ShapefileProcessor:
                                 return None
                         
                         # Transform geometry
-                        geometry = self.transform_geometry(geom, shapefile.crs)
+                        geometry = self.transform_geometry(geom, ct)
                         
                         # Create barangay boundary record
                         BarangayBoundaryNew.objects.create(
@@ -409,55 +705,46 @@ class ShapefileProcessor:
         try:
             file_name = self.uploaded_file.name.lower()
             
-            print(f"📦 Processing file: {file_name}")
-            print(f"📋 Dataset type: {self.dataset_type}")
-            
-            # Extract the uploaded ZIP file first
-            self.temp_dir = tempfile.mkdtemp()
-            temp_zip_path = os.path.join(self.temp_dir, 'upload.zip')
+            logger.info("Processing file: %s", file_name)
+            logger.info("Dataset type: %s", self.dataset_type)
             
-            # Save uploaded file to temp location
-            with open(temp_zip_path, 'wb') as temp_file:
+            # Save uploaded file to a temp ZIP; GDAL reads it in place through
+            # /vsizip/, so nothing is extracted to disk
+            with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as temp_file:
                 for chunk in self.uploaded_file.chunks():
                     temp_file.write(chunk)
+            self.temp_zip_path = temp_file.name
             
-            print(f"💾 Saved to temp: {temp_zip_path}")
-            
-            # Extract ZIP contents
-            with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-                zip_ref.extractall(self.temp_dir)
-            
-            print(f"📂 Extracted to: {self.temp_dir}")
+            logger.info("Saved to temp: %s", self.temp_zip_path)
             
             # 🔍 DETECT FILE TYPE: Look for .gdb directory OR .shp file
             gdb_path = None
             shp_file = None
             
-            for root, dirs, files in os.walk(self.temp_dir):
-                # Check for .gdb directory (File Geodatabase)
-                for dir_name in dirs:
-                    if dir_name.endswith('.gdb'):
-                        gdb_path = os.path.join(root, dir_name)
-                        print(f"✅ Found GDB: {gdb_path}")
-                        break
-                
-                # Check for .shp file (Shapefile)
-                if not gdb_path:
-                    for file in files:
-                        if file.endswith('.shp'):
-                            shp_file = os.path.join(root, file)
-                            print(f"✅ Found Shapefile: {shp_file}")
-                            break
-                
-                if gdb_path or shp_file:
+            with zipfile.ZipFile(self.temp_zip_path, 'r') as zip_ref:
+                members = [name for name in zip_ref.namelist() if not name.startswith('__MACOSX/')]
+            
+            # Check for .gdb directory (File Geodatabase)
+            for name in members:
+                if '.gdb/' in name:
+                    gdb_path = f"/vsizip/{self.temp_zip_path}/{name[:name.index('.gdb/') + 4]}"
+                    logger.info("Found GDB: %s", gdb_path)
                     break
             
+            # Check for .shp file (Shapefile)
+            if not gdb_path:
+                for name in members:
+                    if name.endswith('.shp'):
+                        shp_file = f"/vsizip/{self.temp_zip_path}/{name}"
+                        logger.info("Found Shapefile: %s", shp_file)
+                        break
+            
             # 🚀 PROCESS BASED ON FILE TYPE
             if gdb_path:
                 # ==========================================
                 # PROCESS FILE GEODATABASE (.gdb)
                 # ==========================================
-                print(f"🗄️ Processing as File Geodatabase (GDB)")
+                logger.info("Processing as File Geodatabase (GDB)")
                 
                 # Create dataset record
                 dataset = HazardDataset.objects.create(
@@ -481,7 +768,10 @@ class ShapefileProcessor:
                 # ==========================================
                 # PROCESS SHAPEFILE (.shp)
                 # ==========================================
-                print(f"🗺️ Processing as Shapefile")
+                logger.info("Processing as Shapefile")
+                
+                if self.dataset_type not in self.HAZARD_TYPES:
+                    raise ValueError(f"Unsupported dataset type: {self.dataset_type}")
                 
                 # Create dataset record
                 dataset = HazardDataset.objects.create(
@@ -490,21 +780,23 @@ class ShapefileProcessor:
                     file_name=self.uploaded_file.name
                 )
                 
-                # Route to appropriate shapefile processor
-                if self.dataset_type == 'flood':
-                    records_created = self.process_flood_data(shp_file, dataset)
-                elif self.dataset_type == 'landslide':
-                    records_created = self.process_landslide_data(shp_file, dataset)
-                elif self.dataset_type == 'liquefaction':
-                    records_created = self.process_liquefaction_data(shp_file, dataset)
-                else:
-                    raise ValueError(f"Unsupported dataset type: {self.dataset_type}")
+                # Hand the saved ZIP to the background ingest, which processes
+                # chunks in parallel and removes the file when done
+                from .tasks import start_ingest
+                try:
+                    task_id = start_ingest(self.dataset_type, shp_file, dataset.id, self.temp_zip_path)
+                except Exception:
+                    # Nothing could be queued; don't leave an empty dataset behind
+                    dataset.delete()
+                    raise
+                self.temp_zip_path = None
                 
                 return {
                     'success': True,
                     'dataset_id': dataset.id,
-                    'records_created': records_created,
-                    'message': f'✅ Successfully processed {records_created} records'
+                    'task_id': task_id,
+                    'status': 'processing',
+                    'message': f'⏳ Processing {self.dataset_type} data in the background'
                 }
             
             else:
@@ -519,9 +811,7 @@ class ShapefileProcessor:
                 )
             
         except Exception as e:
-            print(f"❌ Processing error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Processing error: %s", e)
             
             return {
                 'success': False,
@@ -529,14 +819,13 @@ class ShapefileProcessor:
             }
             
         finally:
-            # Cleanup temp directory
-            if self.temp_dir and os.path.exists(self.temp_dir):
-                import shutil
+            # Cleanup temp ZIP
+            if self.temp_zip_path and os.path.exists(self.temp_zip_path):
                 try:
-                    shutil.rmtree(self.temp_dir)
-                    print(f"🧹 Cleaned up temp directory")
+                    os.remove(self.temp_zip_path)
+                    logger.info("Cleaned up temp file")
                 except Exception as cleanup_error:
-                    print(f"⚠️ Could not clean up temp directory: {cleanup_error}")
+                    logger.warning("Could not clean up temp file: %s", cleanup_error)
 
 
 
@@ -1,21 +1,33 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_safe
 from rest_framework.decorators import api_view
-from rest_framework.response import Response
+from django.contrib.gis.db.models.functions import AsGeoJSON
+from django.db.models.functions import Coalesce
 from django.contrib.gis.geos import Point
 from django.core.cache import cache
+from django.db import connection
 from .models import HazardDataset, FloodSusceptibility, LandslideSusceptibility, LiquefactionSusceptibility, BarangayBoundaryNew
 from .utils import ShapefileProcessor
 from .utils import calculate_haversine_distance
+from .tasks import get_ingest_status
 from .overpass_client import OverpassClient
 from math import radians, cos, sin, asin, sqrt
-import json
+import itertools
+import logging
+import orjson
+
+logger = logging.getLogger(__name__)
 
 def index(request):
     """Main map view"""
     return render(request, 'index.html')
 
+def json_response(data, status=200):
+    """Encode a JSON payload with orjson, without DRF's renderer stack"""
+    return HttpResponse(orjson.dumps(data), content_type='application/json', status=status)
+
 @csrf_exempt
 @api_view(['POST'])
 def upload_shapefile(request):
@@ -67,102 +79,186 @@ def upload_shapefile(request):
         result = processor.process()
         
         if result['success']:
-            return JsonResponse(result)
+            # Hazard shapefiles continue in the background (see tasks.py)
+            return JsonResponse(result, status=202 if 'task_id' in result else 200)
         else:
             return JsonResponse({'error': result['error']}, status=500)
     
     return JsonResponse({'error': 'Invalid request method'}, status=405)
 
-@api_view(['GET'])
+@require_safe
+def get_upload_status(request, task_id):
+    """Get progress of a background shapefile ingest started by upload_shapefile"""
+    status = get_ingest_status(task_id)
+    
+    if status is None:
+        return json_response({'error': 'Unknown upload task'}, status=404)
+    
+    return json_response(status)
+
+# Zoom level from which vector tiles are cut from the full geometry
+FULL_DETAIL_ZOOM = 15
+
+# Decimal places per GeoJSON coordinate (6 places ~ 0.11 m)
+GEOJSON_PRECISION = 6
+
+def hazard_map_geometry():
+    """
+    Geometry served by the GeoJSON hazard layers
+    
+    The map loads each layer once for the whole province, so it always gets
+    the simplified copy (falling back to the full geometry where none is
+    stored). Point lookups (get_location_hazards) test the full geometry, so
+    within ~SIMPLIFY_TOLERANCE (11 m) of a boundary the drawn colour and the
+    click result can disagree; the click result is authoritative.
+    """
+    return Coalesce('geometry_simplified', 'geometry')
+
+def geojson_response(queryset, properties, geometry_field='geometry'):
+    """
+    Stream a spatial queryset as a GeoJSON FeatureCollection response
+    
+    PostGIS renders every geometry with ST_AsGeoJSON, so geometries are
+    spliced into the output as-is instead of being parsed and re-encoded
+    in Python, with coordinates rounded to GEOJSON_PRECISION places.
+    Rows are fetched and written 1000 at a time, so memory stays
+    flat regardless of layer size and the first bytes go out early.
+    `properties` maps GeoJSON property names to model fields and
+    `geometry_field` selects which geometry column (or expression) is rendered.
+    
+    The first batch is fetched before returning, so query errors still
+    propagate to the calling view. An error on a later batch happens after
+    the 200 headers are sent; it is logged and ends the stream, leaving a
+    truncated (invalid) JSON body.
+    """
+    names = list(properties)
+    rows = queryset.annotate(
+        geom_json=AsGeoJSON(geometry_field, precision=GEOJSON_PRECISION)
+    ).values_list('geom_json', *properties.values()).iterator(chunk_size=1000)
+    
+    # Runs the query now, while the caller can still answer with a 500
+    first = next(rows, None)
+    
+    def stream():
+        yield b'{"type":"FeatureCollection","features":['
+        if first is not None:
+            features = []
+            separator = b''
+            try:
+                for geom_json, *values in itertools.chain([first], rows):
+                    features.append(b'{"type":"Feature","properties":%s,"geometry":%s}' % (
+                        orjson.dumps(dict(zip(names, values))), geom_json.encode()
+                    ))
+                    # Write one chunk per fetched batch rather than one per feature
+                    if len(features) == 1000:
+                        yield separator + b','.join(features)
+                        features.clear()
+                        separator = b','
+            except Exception:
+                logger.exception("GeoJSON stream failed, response truncated")
+                return
+            if features:
+                yield separator + b','.join(features)
+        yield b']}'
+    
+    return StreamingHttpResponse(stream(), content_type='application/json')
+
+@require_safe
 def get_flood_data(request):
     """Get flood susceptibility data as GeoJSON"""
     try:
-        flood_features = []
-        flood_records = FloodSusceptibility.objects.all()
-        
-        for record in flood_records:
-            feature = {
-                'type': 'Feature',
-                'properties': {
-                    'susceptibility': record.flood_susc,
-                    'original_code': record.original_code,
-                    'shape_area': record.shape_area,
-                    'dataset_id': record.dataset.id
-                },
-                'geometry': json.loads(record.geometry.geojson)
-            }
-            flood_features.append(feature)
-        
-        geojson_data = {
-            'type': 'FeatureCollection',
-            'features': flood_features
-        }
-        
-        return Response(geojson_data)
+        return geojson_response(FloodSusceptibility.objects.all(), {
+            'susceptibility': 'flood_susc',
+            'original_code': 'original_code',
+            'shape_area': 'shape_area',
+            'dataset_id': 'dataset_id'
+        }, hazard_map_geometry())
     
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
 
-@api_view(['GET'])
+@require_safe
 def get_landslide_data(request):
     """Get landslide susceptibility data as GeoJSON"""
     try:
-        landslide_features = []
-        landslide_records = LandslideSusceptibility.objects.all()
-        
-        for record in landslide_records:
-            feature = {
-                'type': 'Feature',
-                'properties': {
-                    'susceptibility': record.landslide_susc,
-                    'original_code': record.original_code,
-                    'shape_area': record.shape_area,
-                    'dataset_id': record.dataset.id
-                },
-                'geometry': json.loads(record.geometry.geojson)
-            }
-            landslide_features.append(feature)
-        
-        geojson_data = {
-            'type': 'FeatureCollection',
-            'features': landslide_features
-        }
-        
-        return Response(geojson_data)
+        return geojson_response(LandslideSusceptibility.objects.all(), {
+            'susceptibility': 'landslide_susc',
+            'original_code': 'original_code',
+            'shape_area': 'shape_area',
+            'dataset_id': 'dataset_id'
+        }, hazard_map_geometry())
     
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
 
-@api_view(['GET'])
+@require_safe
 def get_liquefaction_data(request):
     """Get liquefaction susceptibility data as GeoJSON"""
     try:
-        liquefaction_features = []
-        liquefaction_records = LiquefactionSusceptibility.objects.all()
-        
-        for record in liquefaction_records:
-            feature = {
-                'type': 'Feature',
-                'properties': {
-                    'susceptibility': record.liquefaction_susc,
-                    'original_code': record.original_code,
-                    'dataset_id': record.dataset.id
-                },
-                'geometry': json.loads(record.geometry.geojson)
-            }
-            liquefaction_features.append(feature)
-        
-        geojson_data = {
-            'type': 'FeatureCollection',
-            'features': liquefaction_features
-        }
-        
-        return Response(geojson_data)
+        return geojson_response(LiquefactionSusceptibility.objects.all(), {
+            'susceptibility': 'liquefaction_susc',
+            'original_code': 'original_code',
+            'dataset_id': 'dataset_id'
+        }, hazard_map_geometry())
     
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
 
-@api_view(['GET'])
+# Vector tile layers: URL name -> (model, susceptibility field)
+TILE_LAYERS = {
+    'flood': (FloodSusceptibility, 'flood_susc'),
+    'landslide': (LandslideSusceptibility, 'landslide_susc'),
+    'liquefaction': (LiquefactionSusceptibility, 'liquefaction_susc'),
+}
+
+@require_safe
+def get_hazard_tile(request, layer, z, x, y):
+    """
+    Get one hazard layer tile as a Mapbox Vector Tile
+    
+    PostGIS clips and encodes the features with ST_AsMVTGeom/ST_AsMVT, so
+    the response is a compact protobuf instead of GeoJSON. Low zoom levels
+    are cut from the simplified geometry column.
+    """
+    if layer not in TILE_LAYERS:
+        return json_response({'error': f'Unknown layer: {layer}'}, status=404)
+    
+    if not (0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return json_response({'error': 'Invalid tile coordinates'}, status=400)
+    
+    model, susc_field = TILE_LAYERS[layer]
+    quote = connection.ops.quote_name
+    if z >= FULL_DETAIL_ZOOM:
+        geometry = 't.geometry'
+    else:
+        geometry = 'COALESCE(t.geometry_simplified, t.geometry)'
+    
+    sql = f"""
+        WITH bounds AS (SELECT ST_TileEnvelope(%s, %s, %s) AS envelope)
+        SELECT ST_AsMVT(tile, %s)
+        FROM (
+            SELECT
+                {quote(susc_field)} AS susceptibility,
+                original_code,
+                dataset_id,
+                ST_AsMVTGeom(ST_Transform({geometry}, 3857), bounds.envelope, 4096, 64, true) AS geom
+            FROM {quote(model._meta.db_table)} t, bounds
+            -- A simplified geometry never extends past the full one's bbox,
+            -- so filtering on the indexed full column finds every feature
+            WHERE t.geometry && ST_Transform(bounds.envelope, 4326)
+        ) AS tile
+    """
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [z, x, y, layer])
+        tile = cursor.fetchone()[0]
+    
+    return HttpResponse(
+        bytes(tile) if tile else b'',
+        content_type='application/vnd.mapbox-vector-tile'
+    )
+
+@require_safe
 def get_location_hazards(request):
     """Get hazard levels for a specific point location"""
     try:
@@ -171,17 +267,18 @@ def get_location_hazards(request):
         
         point = Point(lng, lat, srid=4326)
         
+        # Only the level is needed; skip loading both geometry columns
         flood_result = FloodSusceptibility.objects.filter(
             geometry__contains=point
-        ).first()
+        ).only('flood_susc').first()
         
         landslide_result = LandslideSusceptibility.objects.filter(
             geometry__contains=point
-        ).first()
+        ).only('landslide_susc').first()
         
         liquefaction_result = LiquefactionSusceptibility.objects.filter(
             geometry__contains=point
-        ).first()
+        ).only('liquefaction_susc').first()
         
         # Extract levels
         flood_level = flood_result.flood_susc if flood_result else None
@@ -218,7 +315,7 @@ def get_location_hazards(request):
             nearby_facilities
         )
         
-        return Response({
+        return json_response({
             'overall_risk': risk_assessment,
             'suitability': suitability,  # NEW: Added suitability score
             'flood': {
@@ -239,11 +336,11 @@ def get_location_hazards(request):
         })
         
     except ValueError:
-        return Response({'error': 'Invalid coordinates'}, status=400)
+        return json_response({'error': 'Invalid coordinates'}, status=400)
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
     
-@api_view(['GET'])
+@require_safe
 def get_nearby_facilities(request):
     """Get facilities within specified radius with disaster-priority grouping - FIXED VERSION"""
     try:
@@ -258,14 +355,14 @@ def get_nearby_facilities(request):
         cached_result = cache.get(cache_key + "_full")
         if cached_result:
             print(f"✅ Returning cached facility data (avoiding Overpass API call)")
-            return Response(cached_result)
+            return json_response(cached_result)
         
         # Get facilities from Overpass
         facilities = OverpassClient.query_facilities(lat, lng, radius)
         
         # VALIDATION: Check if we got any facilities
         if not facilities or len(facilities) == 0:
-            return Response({
+            return json_response({
                 'error': 'No facilities found in this area',
                 'summary': {
                     'nearest_evacuation': None,
@@ -394,15 +491,15 @@ def get_nearby_facilities(request):
         }
         cache.set(cache_key, simplified_result, 300)
         
-        return Response(result)
+        return json_response(result)
     
     except ValueError:
-        return Response({'error': 'Invalid coordinates or radius'}, status=400)
+        return json_response({'error': 'Invalid coordinates or radius'}, status=400)
     except Exception as e:
         print(f"❌ Error in get_nearby_facilities: {e}")
         import traceback
         traceback.print_exc()
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
 
 def get_user_friendly_label(level, hazard_type):
     """Convert technical labels to citizen-friendly descriptions"""
@@ -1062,17 +1159,17 @@ def generate_smart_recommendations(flood_level, landslide_level, liquefaction_le
         'details': rec_html
     }
 
-@api_view(['GET'])
+@require_safe
 def get_datasets(request):
     """Get list of uploaded datasets"""
     try:
         datasets = HazardDataset.objects.all().values(
             'id', 'name', 'dataset_type', 'upload_date', 'file_name'
         )
-        return Response(list(datasets))
+        return json_response(list(datasets))
     
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
     
 def calculate_distance(lat1, lon1, lat2, lon2):
     """
@@ -1114,7 +1211,7 @@ def format_duration(seconds):
         mins = int(minutes % 60)
         return f"{hours}h {mins}min"
 
-@api_view(['GET'])
+@require_safe
 def get_location_info(request):
     """Get administrative boundary info for a location"""
     try:
@@ -1123,51 +1220,34 @@ def get_location_info(request):
         
         location_info = OverpassClient.get_location_info(lat, lng)
         
-        return Response(location_info)
+        return json_response(location_info)
         
     except ValueError:
-        return Response({'error': 'Invalid coordinates'}, status=400)
+        return json_response({'error': 'Invalid coordinates'}, status=400)
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
 
-@api_view(['GET'])
+@require_safe
 def get_barangay_data(request):
     """Get barangay boundary data as GeoJSON - NEW VERSION"""
     try:
-        barangay_features = []
-        
         # Use the NEW barangay model
-        barangay_records = BarangayBoundaryNew.objects.all()
-        
-        for record in barangay_records:
-            feature = {
-                'type': 'Feature',
-                'properties': {
-                    'barangay_name': record.adm4_en,
-                    'barangay_code': record.adm4_pcode,
-                    'municipality': record.adm3_en,
-                    'province': record.adm2_en,
-                    'region': record.adm1_en,
-                    'area_sqkm': record.area_sqkm,
-                    'dataset_id': record.dataset.id
-                },
-                'geometry': json.loads(record.geometry.geojson)
-            }
-            barangay_features.append(feature)
-        
-        geojson_data = {
-            'type': 'FeatureCollection',
-            'features': barangay_features
-        }
-        
-        return Response(geojson_data)
+        return geojson_response(BarangayBoundaryNew.objects.all(), {
+            'barangay_name': 'adm4_en',
+            'barangay_code': 'adm4_pcode',
+            'municipality': 'adm3_en',
+            'province': 'adm2_en',
+            'region': 'adm1_en',
+            'area_sqkm': 'area_sqkm',
+            'dataset_id': 'dataset_id'
+        })
     
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
 
 
 # REPLACE the old get_barangay_from_point function
-@api_view(['GET'])
+@require_safe
 def get_barangay_from_point(request):
     """
     Get barangay information for a specific point location - NEW VERSION
@@ -1182,10 +1262,13 @@ def get_barangay_from_point(request):
         # Find which barangay boundary contains this point
         barangay = BarangayBoundaryNew.objects.filter(
             geometry__contains=point
+        ).only(
+            'adm4_en', 'adm4_pcode', 'adm3_en', 'adm3_pcode',
+            'adm2_en', 'adm1_en', 'area_sqkm'
         ).first()
         
         if barangay:
-            return Response({
+            return json_response({
                 'success': True,
                 'barangay': barangay.adm4_en,
                 'municipality': barangay.adm3_en,
@@ -1198,7 +1281,7 @@ def get_barangay_from_point(request):
             })
         else:
             # Point is outside all barangay boundaries
-            return Response({
+            return json_response({
                 'success': False,
                 'barangay': 'Unknown',
                 'municipality': 'Unknown',
@@ -1208,12 +1291,12 @@ def get_barangay_from_point(request):
             })
         
     except ValueError:
-        return Response({'error': 'Invalid coordinates'}, status=400)
+        return json_response({'error': 'Invalid coordinates'}, status=400)
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
     
 
-@api_view(['GET'])
+@require_safe
 def get_municipality_info(request):
     """
     Get municipality characteristics by municipality code
@@ -1223,7 +1306,7 @@ def get_municipality_info(request):
         municipality_code = request.GET.get('code')
         
         if not municipality_code:
-            return Response({'error': 'Municipality code not provided'}, status=400)
+            return json_response({'error': 'Municipality code not provided'}, status=400)
         
         from .models import MunicipalityCharacteristic
         
@@ -1233,12 +1316,12 @@ def get_municipality_info(request):
         ).first()
         
         if not municipality:
-            return Response({
+            return json_response({
                 'found': False,
                 'message': 'No data available for this municipality'
             })
         
-        return Response({
+        return json_response({
             'found': True,
             'municipality': {
                 'name': municipality.lgu_name,
@@ -1260,11 +1343,11 @@ def get_municipality_info(request):
         })
         
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
     
 
 
-@api_view(['GET'])
+@require_safe
 def get_barangay_characteristics(request):
     """
     Get barangay characteristics by barangay code with nearby facilities
@@ -1276,7 +1359,7 @@ def get_barangay_characteristics(request):
         lng = request.GET.get('lng')
         
         if not barangay_code:
-            return Response({'error': 'Barangay code not provided'}, status=400)
+            return json_response({'error': 'Barangay code not provided'}, status=400)
         
         from .models import BarangayCharacteristic
         
@@ -1286,7 +1369,7 @@ def get_barangay_characteristics(request):
         ).first()
         
         if not barangay:
-            return Response({
+            return json_response({
                 'found': False,
                 'message': 'No characteristics data available for this barangay'
             })
@@ -1301,7 +1384,7 @@ def get_barangay_characteristics(request):
             except Exception as e:
                 print(f"Error getting facilities: {e}")
         
-        return Response({
+        return json_response({
             'found': True,
             'barangay': {
                 'name': barangay.barangay_name,
@@ -1319,7 +1402,7 @@ def get_barangay_characteristics(request):
         })
         
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
+        return json_response({'error': str(e)}, status=500)
 
 def get_categorized_facilities(lat, lng, radius=3000):
     """
@@ -1450,7 +1533,7 @@ def get_categorized_facilities(lat, lng, radius=3000):
     }
 
 
-@api_view(['GET'])
+@require_safe
 def get_zonal_values(request):
     """
     Get zonal values for a specific barangay by code
@@ -1460,17 +1543,18 @@ def get_zonal_values(request):
         barangay_code = request.GET.get('code')
         
         if not barangay_code:
-            return Response({'error': 'Barangay code not provided'}, status=400)
+            return json_response({'error': 'Barangay code not provided'}, status=400)
         
         from .models import ZonalValue
         
         # Find all zonal values for this barangay
-        zonal_values = ZonalValue.objects.filter(
+        # Evaluated once; the checks below reuse the fetched rows
+        zonal_values = list(ZonalValue.objects.filter(
             barangay_code=barangay_code
-        ).order_by('street', 'vicinity')
+        ).order_by('street', 'vicinity'))
         
-        if not zonal_values.exists():
-            return Response({
+        if not zonal_values:
+            return json_response({
                 'found': False,
                 'message': 'No zonal value data available for this barangay'
             })
@@ -1493,10 +1577,10 @@ def get_zonal_values(request):
                 'price_formatted': zv.get_price_per_sqm_formatted(),
             })
         
-        return Response({
+        return json_response({
             'found': True,
-            'barangay_name': zonal_values.first().barangay_name,
-            'municipality': zonal_values.first().municipality,
+            'barangay_name': zonal_values[0].barangay_name,
+            'municipality': zonal_values[0].municipality,
             'zonal_values': values_list,
             'statistics': {
                 'count': len(values_list),
@@ -1510,4 +1594,4 @@ def get_zonal_values(request):
         })
         
     except Exception as e:
-        return Response({'error': str(e)}, status=500)
\ No newline at end of file
+        return json_response({'error': str(e)}, status=500)
\ No newline at end of file
@@ -116,5 +116,39 @@ CACHES = {
         'OPTIONS': {
             'MAX_ENTRIES': 10000  # Store up to 10k cached locations
         }
+    },
+    # Upload ingest status, kept apart so location caching can't cull it
+    'hazard_ingest': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'hazard_ingest_cache_table',
+        'TIMEOUT': 60 * 60 * 24,  # 1 day
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000  # One entry per 10k-feature chunk, plus one per upload
+        }
     }
-}
\ No newline at end of file
+}
+
+# Hazard shapefile ingest
+# Reproject very large layers on the GPU with cuProj (requires RAPIDS cupy + cuproj)
+HAZARD_GPU_REPROJECTION = False
+HAZARD_GPU_MIN_COORDINATES = 1000000  # Per window; below this, host<->device copies outweigh the speedup
+# Ingest processes started by EACH web worker process (gunicorn with N workers
+# can run N x this many Django processes, each with its own DB connection)
+HAZARD_INGEST_WORKERS = 2
+
+# Logging - hazard ingest reports progress through the hazard_maps loggers
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'hazard_maps': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
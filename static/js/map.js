@@ -893,7 +893,10 @@ async function handleFileUpload(e) {
 
         const result = await response.json();
 
-        if (response.ok) {
+        if (response.ok && result.task_id) {
+            // Hazard shapefiles are ingested in the background
+            pollUploadStatus(result.task_id);
+        } else if (response.ok) {
             showUploadResult(true, `Successfully processed ${result.records_created} records`);
             setTimeout(() => {
                 location.reload();
@@ -907,6 +910,40 @@ async function handleFileUpload(e) {
     }
 }
 
+// Poll every 2 s, giving up after 30 minutes (e.g. if the server restarted mid-ingest)
+const UPLOAD_POLL_INTERVAL = 2000;
+const UPLOAD_POLL_MAX_ATTEMPTS = 900;
+
+async function pollUploadStatus(taskId, attempt = 1) {
+    try {
+        const response = await fetch(`/api/upload-status/${taskId}/`);
+        const status = await response.json();
+
+        if (!response.ok) {
+            showUploadResult(false, status.error || 'Upload failed');
+        } else if (status.status === 'processing') {
+            if (attempt >= UPLOAD_POLL_MAX_ATTEMPTS) {
+                showUploadResult(false, 'Upload is taking too long; check the dataset list later');
+            } else {
+                setTimeout(() => pollUploadStatus(taskId, attempt + 1), UPLOAD_POLL_INTERVAL);
+            }
+        } else if (status.status === 'complete') {
+            const skipped = status.features_skipped
+                ? ` (${status.features_skipped} features with unsupported codes skipped)`
+                : '';
+            showUploadResult(true, `Successfully processed ${status.records_created} records${skipped}`);
+            setTimeout(() => {
+                location.reload();
+            }, 2000);
+        } else {
+            showUploadResult(false, status.errors.join('<br>') || 'Upload failed');
+        }
+    } catch (error) {
+        showUploadResult(false, 'Network error occurred');
+        console.error('Upload status error:', error);
+    }
+}
+
 function showUploadProgress() {
     document.getElementById('upload-form').classList.add('hidden');
     document.getElementById('upload-progress').classList.remove('hidden');